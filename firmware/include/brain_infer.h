@@ -12,6 +12,9 @@
 #define BRAIN_ACTION_COUNT  8       // Number of actions
 #define BRAIN_OUTPUT_SIZE   10      // Actions (8) + valence (1) + arousal (1)
 
+// Quantization flag of int8 model blobs (byte after the version)
+#define BRAIN_QUANT_INT8_PER_CHANNEL  2  // One scale per hidden/output unit
+
 // Model weights structure (for custom MLP)
 typedef struct {
     float w1[BRAIN_INPUT_SIZE][BRAIN_HIDDEN_SIZE];      // Input -> Hidden
@@ -23,7 +26,7 @@ typedef struct {
 // Initialize brain with fallback (rule-based) model
 void brain_init(void);
 
-// Load trained weights from buffer
+// Load trained weights from buffer (float32 or per-channel int8)
 // Returns true if successful
 bool brain_load_weights(const uint8_t* data, uint32_t size);
 
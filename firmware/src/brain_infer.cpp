@@ -6,6 +6,7 @@
 
 static BrainWeights g_weights;
 static bool g_custom_model_loaded = false;
+static bool g_model_quantized = false;
 static uint32_t g_model_version = 0;
 
 // Activation functions
@@ -80,9 +81,67 @@ static void init_fallback_weights(void) {
 void brain_init(void) {
     init_fallback_weights();
     g_custom_model_loaded = false;
+    g_model_quantized = false;
     g_model_version = 0;
 }
 
+// Layout after version and flag:
+// w1 scales [HIDDEN], b1 scale, w2 scales [OUTPUT], b2 scale (float32),
+// then w1, b1, w2, b2 as int8 in the same order as the float32 format
+static bool load_int8_per_channel(const uint8_t* data, uint32_t size) {
+    const uint32_t scales_size =
+        (BRAIN_HIDDEN_SIZE + 1 + BRAIN_OUTPUT_SIZE + 1) * sizeof(float);
+    const uint32_t weights_size =
+        BRAIN_INPUT_SIZE * BRAIN_HIDDEN_SIZE +
+        BRAIN_HIDDEN_SIZE +
+        BRAIN_HIDDEN_SIZE * BRAIN_OUTPUT_SIZE +
+        BRAIN_OUTPUT_SIZE;
+
+    if (size < scales_size + weights_size) {
+        return false;
+    }
+
+    float w1_scales[BRAIN_HIDDEN_SIZE];
+    float b1_scale;
+    float w2_scales[BRAIN_OUTPUT_SIZE];
+    float b2_scale;
+
+    memcpy(w1_scales, data, sizeof(w1_scales));
+    data += sizeof(w1_scales);
+    memcpy(&b1_scale, data, sizeof(float));
+    data += sizeof(float);
+    memcpy(w2_scales, data, sizeof(w2_scales));
+    data += sizeof(w2_scales);
+    memcpy(&b2_scale, data, sizeof(float));
+    data += sizeof(float);
+
+    // Dequantize once so inference keeps the float32 path
+    const int8_t* qdata = (const int8_t*)data;
+    int idx = 0;
+
+    for (int i = 0; i < BRAIN_INPUT_SIZE; i++) {
+        for (int j = 0; j < BRAIN_HIDDEN_SIZE; j++) {
+            g_weights.w1[i][j] = qdata[idx++] * w1_scales[j];
+        }
+    }
+
+    for (int j = 0; j < BRAIN_HIDDEN_SIZE; j++) {
+        g_weights.b1[j] = qdata[idx++] * b1_scale;
+    }
+
+    for (int i = 0; i < BRAIN_HIDDEN_SIZE; i++) {
+        for (int j = 0; j < BRAIN_OUTPUT_SIZE; j++) {
+            g_weights.w2[i][j] = qdata[idx++] * w2_scales[j];
+        }
+    }
+
+    for (int j = 0; j < BRAIN_OUTPUT_SIZE; j++) {
+        g_weights.b2[j] = qdata[idx++] * b2_scale;
+    }
+
+    return true;
+}
+
 bool brain_load_weights(const uint8_t* data, uint32_t size) {
     // Expected size: all weights as float32
     uint32_t expected_size =
@@ -92,7 +151,24 @@ bool brain_load_weights(const uint8_t* data, uint32_t size) {
          BRAIN_OUTPUT_SIZE) * sizeof(float);        // b2
 
     if (size < expected_size + sizeof(uint32_t)) {
-        return false;
+        // Too small for float32, try int8: version + quantization flag
+        if (size < sizeof(uint32_t) + 1 ||
+            data[sizeof(uint32_t)] != BRAIN_QUANT_INT8_PER_CHANNEL) {
+            return false;
+        }
+
+        uint32_t version;
+        memcpy(&version, data, sizeof(uint32_t));
+
+        if (!load_int8_per_channel(data + sizeof(uint32_t) + 1,
+                                   size - sizeof(uint32_t) - 1)) {
+            return false;
+        }
+
+        g_model_version = version;
+        g_model_quantized = true;
+        g_custom_model_loaded = true;
+        return true;
     }
 
     // First 4 bytes are version
@@ -127,6 +203,7 @@ bool brain_load_weights(const uint8_t* data, uint32_t size) {
         g_weights.b2[j] = fdata[idx++];
     }
 
+    g_model_quantized = false;
     g_custom_model_loaded = true;
     return true;
 }
@@ -268,6 +345,7 @@ void brain_fallback(const Features* features, BrainOutput* output) {
 void brain_reset(void) {
     init_fallback_weights();
     g_custom_model_loaded = false;
+    g_model_quantized = false;
     g_model_version = 0;
 }
 
@@ -276,5 +354,5 @@ uint32_t brain_get_model_version(void) {
 }
 
 bool brain_is_quantized(void) {
-    return false; // Current implementation uses float32
+    return g_model_quantized;
 }
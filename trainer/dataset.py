@@ -4,13 +4,20 @@ Dataset Builder for NeuroPet
 Downloads logs from ESP32 and builds training dataset.
 """
 
-import json
 import requests
 import numpy as np
 from pathlib import Path
-from dataclasses import dataclass
-from typing import List, Optional
+from typing import List
 import argparse
+import hashlib
+import shutil
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
 
 
 # Feature names matching ESP32 implementation
@@ -20,213 +27,217 @@ FEATURE_NAMES = [
     'ignore_time_norm', 'time_of_day_sin', 'time_of_day_cos', 'spam_score_norm'
 ]
 
+# Log JSON keys of the features, in FEATURE_NAMES order
+FEATURE_KEYS = ('hunger', 'energy', 'affection', 'trust', 'stress', 'dt',
+                'feed_5m', 'pet_5m', 'ignore', 'tod_sin', 'tod_cos', 'spam')
+
 # Action names
 ACTION_NAMES = ['sleep', 'idle', 'play', 'ask_food', 'ask_pet', 'happy', 'annoyed', 'sad']
 
+# Bump when labeling or reward logic changes to invalidate cached datasets
+DATASET_VERSION = 1
+CACHE_DIR = Path('~/.cache/neuropet').expanduser()
+
 # Input event types
 INPUT_TYPES = ['none', 'feed_short', 'feed_long', 'feed_double',
                'pet_short', 'pet_long', 'pet_double', 'ignore']
+FEED_EVENTS = [i for i, name in enumerate(INPUT_TYPES) if name.startswith('feed')]
+PET_EVENTS = [i for i, name in enumerate(INPUT_TYPES) if name.startswith('pet')]
+IGNORE_EVENT = INPUT_TYPES.index('ignore')
 
 
-@dataclass
-class LogEntry:
-    timestamp: int
-    input_event: int
-    features: np.ndarray
-    action_id: int
-    valence: float
-    arousal: float
-    state_after: dict
-
-
-def fetch_log(esp_ip: str, timeout: int = 10) -> List[dict]:
-    """Fetch event log from ESP32."""
+def fetch_log_raw(esp_ip: str, timeout: int = 10) -> bytes:
+    """Fetch raw event log JSON from ESP32."""
     url = f"http://{esp_ip}/api/log"
     try:
         response = requests.get(url, timeout=timeout)
         response.raise_for_status()
-        return response.json()
+        return response.content
     except requests.RequestException as e:
         print(f"Error fetching log: {e}")
-        return []
+        return b''
 
 
-def parse_log_entry(entry: dict) -> Optional[LogEntry]:
-    """Parse a raw log entry into structured format."""
-    try:
-        features = entry.get('features', {})
-        brain = entry.get('brain', {})
-        state = entry.get('state', {})
-
-        feature_array = np.array([
-            features.get('hunger', 0),
-            features.get('energy', 0),
-            features.get('affection', 0),
-            features.get('trust', 0),
-            features.get('stress', 0),
-            features.get('dt', 0),
-            features.get('feed_5m', 0),
-            features.get('pet_5m', 0),
-            features.get('ignore', 0),
-            features.get('tod_sin', 0),
-            features.get('tod_cos', 0),
-            features.get('spam', 0),
-        ], dtype=np.float32)
-
-        return LogEntry(
-            timestamp=entry.get('ts', 0),
-            input_event=entry.get('event', 0),
-            features=feature_array,
-            action_id=brain.get('action', 0),
-            valence=brain.get('valence', 0),
-            arousal=brain.get('arousal', 0),
-            state_after=state
-        )
-    except Exception as e:
-        print(f"Error parsing entry: {e}")
-        return None
-
-
-def calculate_reward(entry: LogEntry, next_entry: Optional[LogEntry]) -> float:
+def fetch_log(esp_ip: str, timeout: int = 10) -> List[dict]:
+    """Fetch event log from ESP32."""
+    raw = fetch_log_raw(esp_ip, timeout)
+    return _loads(raw) if raw else []
+
+
+def parse_logs(logs: List[dict]) -> tuple:
+    """
+    Parse raw log entries straight into preallocated arrays.
+    Returns (features, input_events, trust_after, stress_after); missing
+    state values are NaN and malformed entries are skipped.
+    """
+    n = len(logs)
+    features = np.zeros((n, len(FEATURE_KEYS)), dtype=np.float32)
+    input_events = np.zeros(n, dtype=np.int32)
+    trust_after = np.full(n, np.nan, dtype=np.float32)
+    stress_after = np.full(n, np.nan, dtype=np.float32)
+
+    count = 0
+    for entry in logs:
+        try:
+            entry_features = entry.get('features', {})
+            state = entry.get('state', {})
+
+            features[count] = [entry_features.get(k, 0) for k in FEATURE_KEYS]
+            input_events[count] = entry.get('event', 0)
+            trust_after[count] = state.get('trust', np.nan)
+            stress_after[count] = state.get('stress', np.nan)
+        except Exception as e:
+            # A later entry overwrites this partially filled row
+            print(f"Error parsing entry: {e}")
+            continue
+        count += 1
+
+    return (features[:count], input_events[:count],
+            trust_after[:count], stress_after[:count])
+
+
+def calculate_reward(features: np.ndarray, input_events: np.ndarray,
+                     trust_next: np.ndarray, stress_next: np.ndarray) -> np.ndarray:
     """
-    Calculate reward for a given interaction.
+    Calculate reward for every interaction.
     Reward-weighted imitation learning approach.
+
+    trust_next/stress_next hold the state logged by the following entry
+    (equal to the current state when unknown).
     """
-    reward = 0.0
-    input_type = INPUT_TYPES[entry.input_event] if entry.input_event < len(INPUT_TYPES) else 'none'
-    features = entry.features
-
-    hunger = features[0]
-    energy = features[1]
-    affection = features[2]
-    trust = features[3]
-    stress = features[4]
-    spam = features[11]
-
-    # Reward for feeding when hungry
-    if input_type.startswith('feed'):
-        if hunger > 0.5:
-            reward += 1.0 * hunger  # More reward for higher hunger
-        elif hunger < 0.2:
-            reward -= 0.5  # Slight penalty for overfeeding
-
-    # Reward for petting when pet needs affection
-    if input_type.startswith('pet'):
-        if affection > 0.5:
-            reward += 1.0 * affection
-        elif affection < 0.15:
-            reward -= 0.3  # Slight penalty for over-petting
+    hunger = features[:, 0]
+    affection = features[:, 2]
+    trust = features[:, 3]
+    stress = features[:, 4]
+    spam = features[:, 11]
+
+    is_feed = np.isin(input_events, FEED_EVENTS)
+    is_pet = np.isin(input_events, PET_EVENTS)
+    is_ignore = input_events == IGNORE_EVENT
+
+    reward = np.zeros(len(features), dtype=np.float32)
+
+    # Reward for feeding when hungry, slight penalty for overfeeding
+    reward += np.where(is_feed & (hunger > 0.5), hunger, 0.0)
+    reward -= np.where(is_feed & (hunger < 0.2), 0.5, 0.0)
+
+    # Reward for petting when pet needs affection, slight penalty for over-petting
+    reward += np.where(is_pet & (affection > 0.5), affection, 0.0)
+    reward -= np.where(is_pet & (affection < 0.15), 0.3, 0.0)
 
     # Penalty for ignore when needs are high
-    if input_type == 'ignore':
-        if hunger > 0.6 or affection > 0.6:
-            reward -= 1.0
+    reward -= np.where(is_ignore & ((hunger > 0.6) | (affection > 0.6)), 1.0, 0.0)
 
     # Penalty for spam
-    if spam > 0.5:
-        reward -= 0.5 * spam
+    reward -= np.where(spam > 0.5, 0.5 * spam, 0.0)
 
     # Bonus for trust improvement
-    if next_entry is not None:
-        trust_change = next_entry.state_after.get('trust', trust) - trust
-        reward += trust_change * 2.0
+    reward += (trust_next - trust) * 2.0
 
     # Stress reduction is good
-    if next_entry is not None:
-        stress_change = stress - next_entry.state_after.get('stress', stress)
-        if stress_change > 0:
-            reward += stress_change * 0.5
+    stress_change = stress - stress_next
+    reward += np.where(stress_change > 0, stress_change * 0.5, 0.0)
 
-    return np.clip(reward, -1.0, 1.0)
+    return np.clip(reward, -1.0, 1.0, out=reward)
 
 
-def determine_target_action(entry: LogEntry) -> int:
+def determine_target_action(features: np.ndarray) -> np.ndarray:
     """
-    Determine the 'ideal' action based on state (teacher labels).
+    Determine the 'ideal' action for every state (teacher labels).
     This provides ground truth for imitation learning.
     """
-    features = entry.features
-    hunger = features[0]
-    energy = features[1]
-    affection = features[2]
-    stress = features[4]
-
-    # Priority-based action selection
-    if energy < 0.2:
-        return 0  # sleep
-    if hunger > 0.7:
-        return 3  # ask_food
-    if affection > 0.6:
-        return 4  # ask_pet
-    if stress > 0.6:
-        return 6  # annoyed
-    if hunger < 0.3 and energy > 0.5 and affection < 0.3 and stress < 0.3:
-        return 5  # happy
-    if energy > 0.6 and stress < 0.4:
-        return 2  # play
-
-    return 1  # idle
-
-
-def determine_target_emotions(entry: LogEntry) -> tuple:
-    """Determine target valence and arousal based on state."""
-    features = entry.features
-    hunger = features[0]
-    energy = features[1]
-    affection = features[2]
-    trust = features[3]
-    stress = features[4]
+    hunger = features[:, 0]
+    energy = features[:, 1]
+    affection = features[:, 2]
+    stress = features[:, 4]
+
+    # Priority-based action selection (first matching condition wins)
+    conditions = [
+        energy < 0.2,
+        hunger > 0.7,
+        affection > 0.6,
+        stress > 0.6,
+        (hunger < 0.3) & (energy > 0.5) & (affection < 0.3) & (stress < 0.3),
+        (energy > 0.6) & (stress < 0.4),
+    ]
+    actions = [
+        0,  # sleep
+        3,  # ask_food
+        4,  # ask_pet
+        6,  # annoyed
+        5,  # happy
+        2,  # play
+    ]
+
+    return np.select(conditions, actions, default=1).astype(np.int32)  # idle
+
+
+def determine_target_emotions(features: np.ndarray) -> tuple:
+    """Determine target valence and arousal for every state."""
+    hunger = features[:, 0]
+    energy = features[:, 1]
+    affection = features[:, 2]
+    trust = features[:, 3]
+    stress = features[:, 4]
 
     # Valence: based on needs being met and trust
     valence = trust - 0.5  # Start with trust influence
     valence -= hunger * 0.3  # Hunger decreases valence
     valence -= affection * 0.2  # Unmet affection decreases
     valence -= stress * 0.4  # Stress decreases
-    valence = np.clip(valence, -1.0, 1.0)
+    np.clip(valence, -1.0, 1.0, out=valence)
 
     # Arousal: based on energy and stress
     arousal = energy * 0.5 + stress * 0.3
-    arousal = np.clip(arousal, 0.0, 1.0)
+    np.clip(arousal, 0.0, 1.0, out=arousal)
 
     return valence, arousal
 
 
-def build_dataset(logs: List[dict], output_path: Path):
-    """Build training dataset from logs."""
-    entries = [parse_log_entry(e) for e in logs]
-    entries = [e for e in entries if e is not None]
+def _next_state(current: np.ndarray, state_after: np.ndarray) -> np.ndarray:
+    """
+    Shift logged state_after values to line up with the previous entry.
+    Missing values (NaN) and the last entry fall back to the current state.
+    """
+    shifted = np.append(state_after[1:], np.nan).astype(np.float32)
+    return np.where(np.isnan(shifted), current, shifted)
 
-    if len(entries) < 2:
-        print("Not enough entries to build dataset")
-        return
 
-    X = []  # Features
-    y_action = []  # Target actions
-    y_valence = []  # Target valence
-    y_arousal = []  # Target arousal
-    weights = []  # Sample weights (based on reward)
+def _score_all(features: np.ndarray, input_events: np.ndarray,
+               trust_next: np.ndarray, stress_next: np.ndarray) -> tuple:
+    """Compute target actions, emotions and sample weights for all entries."""
+    y_action = determine_target_action(features)
+    y_valence, y_arousal = determine_target_emotions(features)
 
-    for i, entry in enumerate(entries):
-        next_entry = entries[i + 1] if i + 1 < len(entries) else None
+    reward = calculate_reward(features, input_events, trust_next, stress_next)
+    # Convert reward to positive weight (shift and scale)
+    weights = (reward + 1.0) / 2.0 + 0.1  # 0.1 to 1.1
 
-        X.append(entry.features)
-        y_action.append(determine_target_action(entry))
+    return (y_action,
+            y_valence.astype(np.float32, copy=False),
+            y_arousal.astype(np.float32, copy=False),
+            weights.astype(np.float32, copy=False))
 
-        valence, arousal = determine_target_emotions(entry)
-        y_valence.append(valence)
-        y_arousal.append(arousal)
 
-        reward = calculate_reward(entry, next_entry)
-        # Convert reward to positive weight (shift and scale)
-        weight = (reward + 1.0) / 2.0 + 0.1  # 0.1 to 1.1
-        weights.append(weight)
+def cached_dataset_path(raw_log: bytes) -> Path:
+    """Cache location of the dataset built from a raw JSON log."""
+    key = hashlib.sha1(raw_log + f"v{DATASET_VERSION}".encode()).hexdigest()
+    return CACHE_DIR / f"{key}.npz"
+
+
+def build_dataset(logs: List[dict], output_path: Path) -> bool:
+    """Build training dataset from logs. Returns True if it was saved."""
+    X, input_events, trust_after, stress_after = parse_logs(logs)
+
+    if len(X) < 2:
+        print("Not enough entries to build dataset")
+        return False
 
-    # Convert to numpy arrays
-    X = np.array(X, dtype=np.float32)
-    y_action = np.array(y_action, dtype=np.int32)
-    y_valence = np.array(y_valence, dtype=np.float32)
-    y_arousal = np.array(y_arousal, dtype=np.float32)
-    weights = np.array(weights, dtype=np.float32)
+    trust_next = _next_state(X[:, 3], trust_after)
+    stress_next = _next_state(X[:, 4], stress_after)
+
+    y_action, y_valence, y_arousal, weights = _score_all(
+        X, input_events, trust_next, stress_next)
 
     # Save dataset
     np.savez(output_path,
@@ -243,6 +254,8 @@ def build_dataset(logs: List[dict], output_path: Path):
     print(f"  Features: {X.shape[1]}")
     print(f"  Actions distribution: {np.bincount(y_action, minlength=len(ACTION_NAMES))}")
 
+    return True
+
 
 def main():
     parser = argparse.ArgumentParser(description='Build NeuroPet training dataset')
@@ -250,20 +263,40 @@ def main():
     parser.add_argument('--input', type=Path, help='Input JSON file (instead of fetching)')
     parser.add_argument('--output', type=Path, default=Path('dataset.npz'),
                         help='Output dataset file')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Rebuild even if a cached dataset exists')
     args = parser.parse_args()
 
     if args.input:
         # Load from file
-        with open(args.input) as f:
-            logs = json.load(f)
+        raw_log = args.input.read_bytes()
     else:
         # Fetch from ESP32
         print(f"Fetching logs from {args.ip}...")
-        logs = fetch_log(args.ip)
+        raw_log = fetch_log_raw(args.ip)
+
+    if not raw_log:
+        print("No logs to process")
+        return
+
+    # np.savez appends .npz when missing, use the same name for cache hits
+    output = args.output
+    if output.suffix != '.npz':
+        output = output.with_name(output.name + '.npz')
+
+    cache_path = cached_dataset_path(raw_log)
+    if cache_path.exists() and not args.no_cache:
+        shutil.copyfile(cache_path, output)
+        print(f"Dataset loaded from cache: {cache_path}")
+        print(f"Dataset saved: {output}")
+        return
 
+    logs = _loads(raw_log)
     if logs:
         print(f"Got {len(logs)} log entries")
-        build_dataset(logs, args.output)
+        if build_dataset(logs, output):
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(output, cache_path)
     else:
         print("No logs to process")
 
@@ -17,6 +17,15 @@ INPUT_SIZE = 12
 HIDDEN_SIZE = 16
 OUTPUT_SIZE = 10
 
+# Quantization flag of int8 blobs (must match BRAIN_QUANT_INT8_PER_CHANNEL)
+QUANT_INT8_PER_CHANNEL = 2
+
+# Prebuilt blob headers, specialized for the fixed architecture:
+# float32: version; int8: version, quantization flag, w1 scales, b1 scale,
+# w2 scales, b2 scale
+_HDR_F32 = struct.Struct('<I')
+_HDR_INT8 = struct.Struct(f'<IB{HIDDEN_SIZE + 1 + OUTPUT_SIZE + 1}f')
+
 
 def load_model(model_path: Path) -> dict:
     """Load PyTorch model checkpoint."""
@@ -24,92 +33,70 @@ def load_model(model_path: Path) -> dict:
     return checkpoint['model_state_dict']
 
 
-def extract_weights(state_dict: dict) -> tuple:
-    """Extract weights as numpy arrays."""
-    w1 = state_dict['fc1.weight'].numpy()  # [HIDDEN_SIZE, INPUT_SIZE]
-    b1 = state_dict['fc1.bias'].numpy()    # [HIDDEN_SIZE]
-    w2 = state_dict['fc2.weight'].numpy()  # [OUTPUT_SIZE, HIDDEN_SIZE]
-    b2 = state_dict['fc2.bias'].numpy()    # [OUTPUT_SIZE]
+def _to_wire(weight: torch.Tensor) -> np.ndarray:
+    """Transpose a Linear weight [out, in] to the ESP32 row-major [in, out] layout."""
+    return weight.detach().t().contiguous().to(torch.float32).numpy()
 
-    # Transpose to match ESP32 layout [input, hidden]
-    w1 = w1.T  # [INPUT_SIZE, HIDDEN_SIZE]
-    w2 = w2.T  # [HIDDEN_SIZE, OUTPUT_SIZE]
-
-    return w1, b1, w2, b2
-
-
-def pack_float32(w1, b1, w2, b2, version: int) -> bytes:
-    """Pack weights as float32 binary."""
-    data = bytearray()
 
-    # Version (4 bytes)
-    data.extend(struct.pack('<I', version))
+def _bias(bias: torch.Tensor) -> np.ndarray:
+    """Convert a Linear bias to a float32 numpy array."""
+    return bias.detach().to(torch.float32).numpy()
 
-    # w1: [INPUT_SIZE, HIDDEN_SIZE]
-    for i in range(INPUT_SIZE):
-        for j in range(HIDDEN_SIZE):
-            data.extend(struct.pack('<f', w1[i, j]))
 
-    # b1: [HIDDEN_SIZE]
-    for j in range(HIDDEN_SIZE):
-        data.extend(struct.pack('<f', b1[j]))
+def extract_weights(state_dict: dict) -> tuple:
+    """Extract weights as numpy arrays in ESP32 layout."""
+    w1 = _to_wire(state_dict['fc1.weight'])  # [INPUT_SIZE, HIDDEN_SIZE]
+    b1 = _bias(state_dict['fc1.bias'])       # [HIDDEN_SIZE]
+    w2 = _to_wire(state_dict['fc2.weight'])  # [HIDDEN_SIZE, OUTPUT_SIZE]
+    b2 = _bias(state_dict['fc2.bias'])       # [OUTPUT_SIZE]
 
-    # w2: [HIDDEN_SIZE, OUTPUT_SIZE]
-    for i in range(HIDDEN_SIZE):
-        for j in range(OUTPUT_SIZE):
-            data.extend(struct.pack('<f', w2[i, j]))
+    return w1, b1, w2, b2
 
-    # b2: [OUTPUT_SIZE]
-    for j in range(OUTPUT_SIZE):
-        data.extend(struct.pack('<f', b2[j]))
 
-    return bytes(data)
+def pack_float32(w1, b1, w2, b2, version: int) -> bytes:
+    """Pack weights as float32 binary."""
+    # Version (4 bytes), then w1 [INPUT_SIZE, HIDDEN_SIZE], b1 [HIDDEN_SIZE],
+    # w2 [HIDDEN_SIZE, OUTPUT_SIZE], b2 [OUTPUT_SIZE] as little-endian floats
+    return (_HDR_F32.pack(version) +
+            np.ascontiguousarray(w1, dtype='<f4').tobytes() +
+            np.ascontiguousarray(b1, dtype='<f4').tobytes() +
+            np.ascontiguousarray(w2, dtype='<f4').tobytes() +
+            np.ascontiguousarray(b2, dtype='<f4').tobytes())
 
 
 def quantize_int8(weights: np.ndarray) -> tuple:
     """Quantize weights to int8 with scale factor."""
-    w_min = weights.min()
-    w_max = weights.max()
-    scale = max(abs(w_min), abs(w_max)) / 127.0
+    scale = float(np.abs(weights).max()) / 127.0
     if scale == 0:
         scale = 1.0
-    quantized = np.clip(np.round(weights / scale), -127, 127).astype(np.int8)
+    quantized = np.rint(weights * (1.0 / scale)).clip(-127, 127).astype(np.int8)
     return quantized, scale
 
 
-def pack_int8(w1, b1, w2, b2, version: int) -> bytes:
-    """Pack weights as int8 with scale factors."""
-    data = bytearray()
-
-    # Version (4 bytes)
-    data.extend(struct.pack('<I', version))
+def quantize_int8_per_channel(weights: np.ndarray) -> tuple:
+    """Quantize [in, out] weights to int8 with one scale per output unit."""
+    scales = np.abs(weights).max(axis=0) / 127.0
+    scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+    quantized = np.rint(weights * (1.0 / scales)).clip(-127, 127).astype(np.int8)
+    return quantized, scales
 
-    # Quantization flag
-    data.extend(struct.pack('<B', 1))  # 1 = int8 quantized
 
+def pack_int8(w1, b1, w2, b2, version: int) -> bytes:
+    """Pack weights as int8 with per-channel scale factors."""
     # Quantize each weight matrix
-    w1_q, w1_scale = quantize_int8(w1)
+    w1_q, w1_scales = quantize_int8_per_channel(w1)  # HIDDEN_SIZE scales
     b1_q, b1_scale = quantize_int8(b1)
-    w2_q, w2_scale = quantize_int8(w2)
+    w2_q, w2_scales = quantize_int8_per_channel(w2)  # OUTPUT_SIZE scales
     b2_q, b2_scale = quantize_int8(b2)
 
-    # Pack scales (4 floats)
-    data.extend(struct.pack('<f', w1_scale))
-    data.extend(struct.pack('<f', b1_scale))
-    data.extend(struct.pack('<f', w2_scale))
-    data.extend(struct.pack('<f', b2_scale))
-
-    # Pack quantized weights
-    data.extend(w1_q.tobytes())
-    data.extend(b1_q.tobytes())
-    data.extend(w2_q.tobytes())
-    data.extend(b2_q.tobytes())
+    header = _HDR_INT8.pack(version, QUANT_INT8_PER_CHANNEL,
+                            *w1_scales, b1_scale, *w2_scales, b2_scale)
 
-    return bytes(data)
+    return header + w1_q.tobytes() + b1_q.tobytes() + w2_q.tobytes() + b2_q.tobytes()
 
 
 def calculate_crc32(data: bytes) -> int:
-    """Calculate CRC32 checksum."""
+    """Calculate CRC32 checksum of the packed blob."""
     return zlib.crc32(data) & 0xFFFFFFFF
 
 
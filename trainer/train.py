@@ -26,11 +26,11 @@ class NeuroPetDataset(Dataset):
 
     def __init__(self, npz_path: Path):
         data = np.load(npz_path)
-        self.X = torch.from_numpy(data['X'])
+        self.X = torch.from_numpy(data['X']).float()
         self.y_action = torch.from_numpy(data['y_action']).long()
-        self.y_valence = torch.from_numpy(data['y_valence'])
-        self.y_arousal = torch.from_numpy(data['y_arousal'])
-        self.weights = torch.from_numpy(data['weights'])
+        self.y_valence = torch.from_numpy(data['y_valence']).float()
+        self.y_arousal = torch.from_numpy(data['y_arousal']).float()
+        self.weights = torch.from_numpy(data['weights']).float()
 
     def __len__(self):
         return len(self.X)
@@ -64,19 +64,20 @@ class NeuroPetMLP(nn.Module):
 def train_epoch(model, loader, optimizer, device):
     """Train for one epoch."""
     model.train()
-    total_loss = 0
-    action_correct = 0
+    # Accumulate on device, synchronize once at the end of the epoch
+    total_loss = torch.zeros((), device=device)
+    action_correct = torch.zeros((), device=device)
     total_samples = 0
 
     criterion_action = nn.CrossEntropyLoss(reduction='none')
     criterion_emotion = nn.MSELoss(reduction='none')
 
     for X, y_action, y_valence, y_arousal, weights in loader:
-        X = X.to(device)
-        y_action = y_action.to(device)
-        y_valence = y_valence.to(device)
-        y_arousal = y_arousal.to(device)
-        weights = weights.to(device)
+        X = X.to(device, non_blocking=True)
+        y_action = y_action.to(device, non_blocking=True)
+        y_valence = y_valence.to(device, non_blocking=True)
+        y_arousal = y_arousal.to(device, non_blocking=True)
+        weights = weights.to(device, non_blocking=True)
 
         optimizer.zero_grad()
 
@@ -98,43 +99,44 @@ def train_epoch(model, loader, optimizer, device):
         loss.backward()
         optimizer.step()
 
-        total_loss += loss.item() * len(X)
+        total_loss += loss.detach() * len(X)
 
         # Accuracy
         pred = action_logits.argmax(dim=1)
-        action_correct += (pred == y_action).sum().item()
+        action_correct += (pred == y_action).sum()
         total_samples += len(X)
 
-    return total_loss / total_samples, action_correct / total_samples
+    return (total_loss / total_samples).item(), (action_correct / total_samples).item()
 
 
 def evaluate(model, loader, device):
     """Evaluate model."""
     model.eval()
-    action_correct = 0
+    # Accumulate on device, synchronize once at the end
+    action_correct = torch.zeros((), device=device)
+    valence_error = torch.zeros((), device=device)
+    arousal_error = torch.zeros((), device=device)
     total_samples = 0
-    valence_error = 0
-    arousal_error = 0
 
-    with torch.no_grad():
+    with torch.inference_mode():
         for X, y_action, y_valence, y_arousal, _ in loader:
-            X = X.to(device)
-            y_action = y_action.to(device)
-            y_valence = y_valence.to(device)
-            y_arousal = y_arousal.to(device)
+            X = X.to(device, non_blocking=True)
+            y_action = y_action.to(device, non_blocking=True)
+            y_valence = y_valence.to(device, non_blocking=True)
+            y_arousal = y_arousal.to(device, non_blocking=True)
 
             action_logits, valence, arousal = model(X)
 
             pred = action_logits.argmax(dim=1)
-            action_correct += (pred == y_action).sum().item()
+            action_correct += (pred == y_action).sum()
             total_samples += len(X)
 
-            valence_error += ((valence - y_valence) ** 2).sum().item()
-            arousal_error += ((arousal - y_arousal) ** 2).sum().item()
+            valence_error += nn.functional.mse_loss(valence, y_valence, reduction='sum')
+            arousal_error += nn.functional.mse_loss(arousal, y_arousal, reduction='sum')
 
-    acc = action_correct / total_samples
-    val_rmse = np.sqrt(valence_error / total_samples)
-    aro_rmse = np.sqrt(arousal_error / total_samples)
+    acc = (action_correct / total_samples).item()
+    val_rmse = np.sqrt(valence_error.item() / total_samples)
+    aro_rmse = np.sqrt(arousal_error.item() / total_samples)
 
     return acc, val_rmse, aro_rmse
 
@@ -143,77 +145,59 @@ def generate_synthetic_data(n_samples: int = 1000) -> Path:
     """Generate synthetic training data for initial model."""
     print(f"Generating {n_samples} synthetic samples...")
 
-    X = np.random.rand(n_samples, INPUT_SIZE).astype(np.float32)
-    y_action = np.zeros(n_samples, dtype=np.int32)
-    y_valence = np.zeros(n_samples, dtype=np.float32)
-    y_arousal = np.zeros(n_samples, dtype=np.float32)
+    rng = np.random.default_rng()
+
+    X = rng.random((n_samples, INPUT_SIZE), dtype=np.float32)
     weights = np.ones(n_samples, dtype=np.float32)
 
-    for i in range(n_samples):
-        hunger = X[i, 0]
-        energy = X[i, 1]
-        affection = X[i, 2]
-        trust = X[i, 3]
-        stress = X[i, 4]
-
-        # Generate realistic time of day (cyclical encoding)
-        # More samples at typical owner interaction times (morning, evening)
-        if np.random.rand() < 0.3:
-            hour = np.random.choice([7, 8, 9, 18, 19, 20, 21])  # Typical interaction times
-        else:
-            hour = np.random.randint(0, 24)
-
-        hour_angle = hour / 24.0 * 2 * np.pi
-        X[i, 9] = np.sin(hour_angle)   # time_of_day_sin
-        X[i, 10] = np.cos(hour_angle)  # time_of_day_cos
-
-        # Determine if it's night (22:00 - 07:00)
-        is_night = hour >= 22 or hour < 7
-
-        # Determine action (with time awareness)
-        if is_night and energy < 0.5:
-            action = 0  # sleep - prefer sleep at night
-        elif energy < 0.15:
-            action = 0  # sleep - very tired
-        elif is_night:
-            # At night, prefer calm activities
-            if hunger > 0.8:
-                action = 3  # ask_food (only if very hungry)
-            elif np.random.rand() < 0.6:
-                action = 0  # sleep
-            else:
-                action = 1  # idle
-        elif hunger > 0.7:
-            action = 3  # ask_food
-        elif affection > 0.6:
-            action = 4  # ask_pet
-        elif stress > 0.6:
-            action = 6  # annoyed
-        elif hunger < 0.3 and energy > 0.5 and affection < 0.3 and stress < 0.3:
-            action = 5  # happy
-        elif energy > 0.6 and stress < 0.4:
-            action = 2  # play
-        else:
-            action = 1  # idle
-
-        y_action[i] = action
-
-        # Determine emotions (with time influence)
-        valence = trust - 0.5 - hunger * 0.3 - affection * 0.2 - stress * 0.4
-        if is_night:
-            valence -= 0.1  # Slightly lower mood at night
-        y_valence[i] = np.clip(valence, -1.0, 1.0)
-
-        arousal = energy * 0.5 + stress * 0.3
-        if is_night:
-            arousal *= 0.7  # Lower arousal at night
-        y_arousal[i] = np.clip(arousal, 0.0, 1.0)
-
-        # Add some noise
-        y_valence[i] += np.random.randn() * 0.1
-        y_arousal[i] += np.random.randn() * 0.1
-        y_valence[i] = np.clip(y_valence[i], -1.0, 1.0)
-        y_arousal[i] = np.clip(y_arousal[i], 0.0, 1.0)
+    hunger = X[:, 0]
+    energy = X[:, 1]
+    affection = X[:, 2]
+    trust = X[:, 3]
+    stress = X[:, 4]
+
+    # Generate realistic time of day (cyclical encoding)
+    # More samples at typical owner interaction times (morning, evening)
+    interactive = rng.random(n_samples) < 0.3
+    hours = np.where(interactive,
+                     rng.choice([7, 8, 9, 18, 19, 20, 21], n_samples),  # Typical interaction times
+                     rng.integers(0, 24, n_samples))
+
+    hour_angle = hours / 24.0 * 2 * np.pi
+    X[:, 9] = np.sin(hour_angle)   # time_of_day_sin
+    X[:, 10] = np.cos(hour_angle)  # time_of_day_cos
+
+    # Determine if it's night (22:00 - 07:00)
+    is_night = (hours >= 22) | (hours < 7)
+
+    # Determine action (with time awareness), first matching condition wins
+    y_action = np.select([
+        is_night & (energy < 0.5),   # sleep - prefer sleep at night
+        energy < 0.15,               # sleep - very tired
+        is_night & (hunger > 0.8),   # ask_food (only if very hungry at night)
+        is_night & (rng.random(n_samples) < 0.6),  # sleep
+        is_night,                    # idle - calm activities at night
+        hunger > 0.7,                # ask_food
+        affection > 0.6,             # ask_pet
+        stress > 0.6,                # annoyed
+        (hunger < 0.3) & (energy > 0.5) & (affection < 0.3) & (stress < 0.3),  # happy
+        (energy > 0.6) & (stress < 0.4),  # play
+    ], [0, 0, 3, 0, 1, 3, 4, 6, 5, 2], default=1).astype(np.int32)  # idle
+
+    # Determine emotions (with time influence)
+    valence = trust - 0.5 - hunger * 0.3 - affection * 0.2 - stress * 0.4
+    valence -= np.where(is_night, 0.1, 0.0)  # Slightly lower mood at night
+    y_valence = np.clip(valence, -1.0, 1.0, out=valence)
+
+    arousal = energy * 0.5 + stress * 0.3
+    arousal *= np.where(is_night, 0.7, 1.0)  # Lower arousal at night
+    y_arousal = np.clip(arousal, 0.0, 1.0, out=arousal)
+
+    # Add some noise
+    y_valence += rng.standard_normal(n_samples, dtype=np.float32) * 0.1
+    y_arousal += rng.standard_normal(n_samples, dtype=np.float32) * 0.1
+    np.clip(y_valence, -1.0, 1.0, out=y_valence)
+    np.clip(y_arousal, 0.0, 1.0, out=y_arousal)
 
     output_path = Path('synthetic_dataset.npz')
     np.savez(output_path,
@@ -232,6 +216,8 @@ def main():
     parser.add_argument('--lr', type=float, default=0.001)
     parser.add_argument('--batch-size', type=int, default=32)
     parser.add_argument('--output', type=Path, default=Path('model.pt'))
+    parser.add_argument('--num-workers', type=int, default=0,
+                        help='DataLoader worker processes (0 = load in main process)')
     args = parser.parse_args()
 
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
@@ -255,11 +241,23 @@ def main():
     train_dataset, val_dataset = torch.utils.data.random_split(
         dataset, [train_size, val_size])
 
-    train_loader = DataLoader(train_dataset, batch_size=args.batch_size, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=args.batch_size)
+    # Batches are pinned by the loader, which allows non_blocking copies
+    loader_args = dict(batch_size=args.batch_size,
+                       pin_memory=device.type == 'cuda',
+                       num_workers=args.num_workers)
+    if args.num_workers > 0:
+        loader_args.update(prefetch_factor=4, persistent_workers=True)
+    train_loader = DataLoader(train_dataset, shuffle=True, **loader_args)
+    val_loader = DataLoader(val_dataset, **loader_args)
 
     # Create model
     model = NeuroPetMLP().to(device)
+    net = model
+    if device.type == 'cuda':
+        # Fuse the tiny MLP into generated kernels, dispatch overhead dominates
+        torch.set_float32_matmul_precision('high')
+        torch.backends.cudnn.benchmark = True
+        net = torch.compile(model, mode='reduce-overhead', fullgraph=True)
     optimizer = optim.Adam(model.parameters(), lr=args.lr)
     scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, patience=10, factor=0.5)
 
@@ -267,8 +265,8 @@ def main():
     best_acc = 0
 
     for epoch in range(args.epochs):
-        train_loss, train_acc = train_epoch(model, train_loader, optimizer, device)
-        val_acc, val_rmse, aro_rmse = evaluate(model, val_loader, device)
+        train_loss, train_acc = train_epoch(net, train_loader, optimizer, device)
+        val_acc, val_rmse, aro_rmse = evaluate(net, val_loader, device)
 
         scheduler.step(val_acc)
 
@@ -4,28 +4,53 @@ Upload trained model to ESP32 via HTTP.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 from pathlib import Path
 import argparse
 import time
+import zlib
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+def create_session() -> requests.Session:
+    """Create a keep-alive HTTP session with retry/backoff for the ESP32."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1,
+                          max_retries=Retry(total=3, backoff_factor=0.2))
+    session.mount('http://', adapter)
+    session.headers.update({'Connection': 'keep-alive'})
+    return session
 
 
 def load_metadata(meta_path: Path) -> dict:
     """Load model metadata."""
-    with open(meta_path) as f:
-        return json.load(f)
+    return _loads(meta_path.read_bytes())
+
+
+def file_crc32(path: Path, chunk_size: int = 65536) -> int:
+    """Calculate CRC32 of a file without reading it into memory at once."""
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc & 0xFFFFFFFF
 
 
 def upload_model(esp_ip: str, model_path: Path, meta_path: Path = None,
-                 timeout: int = 30) -> bool:
+                 timeout: int = 30, session: requests.Session = None) -> bool:
     """Upload model to ESP32."""
+    http = session or requests
     url = f"http://{esp_ip}/api/model"
 
-    # Load model binary
-    with open(model_path, 'rb') as f:
-        model_data = f.read()
-
-    print(f"Model size: {len(model_data)} bytes")
+    model_size = model_path.stat().st_size
+    print(f"Model size: {model_size} bytes")
 
     # Load or generate metadata
     if meta_path and meta_path.exists():
@@ -37,12 +62,11 @@ def upload_model(esp_ip: str, model_path: Path, meta_path: Path = None,
             meta = load_metadata(auto_meta)
         else:
             print("Warning: No metadata file, using defaults")
-            import zlib
             meta = {
                 'version': 1,
                 'features_version': 1,
-                'size': len(model_data),
-                'crc32': zlib.crc32(model_data) & 0xFFFFFFFF,
+                'size': model_size,
+                'crc32': file_crc32(model_path),
                 'created_at': int(time.time())
             }
 
@@ -50,6 +74,7 @@ def upload_model(esp_ip: str, model_path: Path, meta_path: Path = None,
 
     headers = {
         'Content-Type': 'application/octet-stream',
+        'Content-Length': str(model_size),
         'X-Model-Size': str(meta['size']),
         'X-Model-Version': str(meta['version']),
         'X-Features-Version': str(meta.get('features_version', 1)),
@@ -60,7 +85,9 @@ def upload_model(esp_ip: str, model_path: Path, meta_path: Path = None,
     print(f"Uploading to {url}...")
 
     try:
-        response = requests.post(url, data=model_data, headers=headers,
+        # Stream the body straight from disk
+        with open(model_path, 'rb') as f:
+            response = http.post(url, data=f, headers=headers,
                                  timeout=timeout)
 
         if response.status_code == 200:
@@ -78,21 +105,25 @@ def upload_model(esp_ip: str, model_path: Path, meta_path: Path = None,
         return False
 
 
-def check_status(esp_ip: str, timeout: int = 5) -> dict:
+def check_status(esp_ip: str, timeout: int = 5,
+                 session: requests.Session = None) -> dict:
     """Check ESP32 status."""
+    http = session or requests
     url = f"http://{esp_ip}/api/status"
     try:
-        response = requests.get(url, timeout=timeout)
+        response = http.get(url, timeout=timeout)
         return response.json()
     except:
         return None
 
 
-def check_model(esp_ip: str, timeout: int = 5) -> dict:
+def check_model(esp_ip: str, timeout: int = 5,
+                session: requests.Session = None) -> dict:
     """Check current model on ESP32."""
+    http = session or requests
     url = f"http://{esp_ip}/api/model/meta"
     try:
-        response = requests.get(url, timeout=timeout)
+        response = http.get(url, timeout=timeout)
         if response.status_code == 200:
             return response.json()
         return None
@@ -114,9 +145,12 @@ def main():
                         help='Check current model only')
     args = parser.parse_args()
 
+    # Reuse one connection for the status -> upload -> verify sequence
+    session = create_session()
+
     if args.status:
         print(f"Checking status of {args.ip}...")
-        status = check_status(args.ip)
+        status = check_status(args.ip, session=session)
         if status:
             print(json.dumps(status, indent=2))
         else:
@@ -125,7 +159,7 @@ def main():
 
     if args.check_model:
         print(f"Checking model on {args.ip}...")
-        model_info = check_model(args.ip)
+        model_info = check_model(args.ip, session=session)
         if model_info:
             print(json.dumps(model_info, indent=2))
         else:
@@ -143,19 +177,19 @@ def main():
 
     # First check connection
     print(f"Connecting to ESP32 at {args.ip}...")
-    status = check_status(args.ip)
+    status = check_status(args.ip, session=session)
     if status:
         print(f"Connected! Firmware: {status.get('firmware_version', 'unknown')}")
     else:
         print("Warning: Could not verify connection, attempting upload anyway...")
 
     # Upload
-    success = upload_model(args.ip, args.model, args.meta)
+    success = upload_model(args.ip, args.model, args.meta, session=session)
 
     if success:
         print("\nVerifying upload...")
         time.sleep(1)
-        model_info = check_model(args.ip)
+        model_info = check_model(args.ip, session=session)
         if model_info:
             print(f"Model on device: v{model_info.get('version', '?')}")
         return 0